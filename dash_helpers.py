@@ -1,14 +1,12 @@
 """Helper functions for the dashboard."""
 
 import locale
-from datetime import datetime
 
-import pandas as pd  # noqa: TC002
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
-from report import get_distribution
-
 
 def display_metrics(report_df: pd.DataFrame, error_df: pd.DataFrame) -> None:
     """Display the metrics for the dashboard.
@@ -25,11 +23,7 @@ def display_metrics(report_df: pd.DataFrame, error_df: pd.DataFrame) -> None:
     total_reported_amount = float(report_df["Jelentett érték"].sum())
     col1, col2 = st.columns(2)
     with col1:
-        period_start = report_df["Időszak"].min()
-        period_end = report_df["Időszak"].max()
-        formatted_start = datetime.strptime(str(period_start), "%Y%m").strftime("%Y. %B")
-        formatted_end = datetime.strptime(str(period_end), "%Y%m").strftime("%Y. %B")
-        st.metric("Időszak", f"{formatted_start} - {formatted_end}")
+        st.metric("Időszak", f"{report_df.attrs['period_start_fmt']} - {report_df.attrs['period_end_fmt']}")
     with col2:
         st.metric("Betegek száma", f"{len(report_df)} fő")
 
@@ -56,43 +50,39 @@ def display_metrics(report_df: pd.DataFrame, error_df: pd.DataFrame) -> None:
         )
 
 
-def display_age_distribution_chart(report_df: pd.DataFrame) -> None:
+def display_age_distribution_chart(report_df: pd.DataFrame, stats: dict[str, dict[str, int]]) -> None:
     """Display the age distribution chart for the dashboard.
 
     Args:
         report_df: The report DataFrame.
+        stats: The precomputed column distributions.
 
     Returns:
         None.
 
     """
-    age_group_distribution = get_distribution(report_df, "Életkor csoport")
+    age_group_distribution = stats["Életkor csoport"]
     col_chart, col_stats = st.columns([3, 1])
 
     with col_chart:
         st.subheader("Életkor és nem szerinti eloszlás")
 
-        age_gender_pivot = (
-            report_df.groupby(["Életkor csoport", "Nem"], observed=True)
-            .size()
-            .reset_index(name="Count")
-            .pivot_table(index="Életkor csoport", columns="Nem", values="Count", observed=True)
-            .fillna(0)
-        )
-
-        age_gender_pivot = age_gender_pivot.sort_index()
+        age_gender_pivot = pd.crosstab(report_df["Életkor csoport"], report_df["Nem"], dropna=False).sort_index()
         genders = age_gender_pivot.columns.tolist()
         gender_colors = {"Férfi": "#3498db", "Nő": "#e74c3c"}
 
+        age_groups = np.asarray(age_gender_pivot.index)
+
         fig = go.Figure()
         for gender in genders:
+            counts = age_gender_pivot[gender].to_numpy(dtype=np.int32)
             fig.add_trace(
                 go.Bar(
                     name=gender,
-                    x=age_gender_pivot.index.tolist(),
-                    y=age_gender_pivot[gender].tolist(),
+                    x=age_groups,
+                    y=counts,
                     marker={"color": gender_colors.get(gender, "#95a5a6")},
-                    text=[int(v) if v > 0 else "" for v in age_gender_pivot[gender].tolist()],
+                    text=np.where(counts > 0, counts.astype(str), ""),
                     textposition="inside",
                     hovertemplate=(
                         f"<b>Életkor:</b> %{{x}} év<br>"
@@ -136,45 +126,78 @@ def display_age_distribution_chart(report_df: pd.DataFrame) -> None:
 
         st.markdown("---")
         st.subheader("Nem szerinti eloszlás")
-        gender_dist = report_df["Nem"].value_counts()
-        for gender, count in gender_dist.items():
+        gender_dist = sorted(stats["Nem"].items(), key=lambda x: x[1], reverse=True)
+        for gender, count in gender_dist:
             st.write(f"**{gender}:** {count} ({count / len(report_df) * 100:.2f}%)")
 
 
-def display_bno_distribution_chart(report_df: pd.DataFrame, bno_codes: dict[str, str]) -> None:
+@st.cache_data(show_spinner=False)
+def _distribution_bar_figure(labels: tuple[str, ...], values: tuple[int, ...]) -> go.Figure:
+    """Build the horizontal bar chart figure of a code distribution.
+
+    Cached with st.cache_data, so reruns with the same distribution reuse the figure.
+
+    Args:
+        labels: The category labels.
+        values: The counts of the categories.
+
+    Returns:
+        The Plotly figure, with the bars sorted by count.
+
+    """
+    counts = np.asarray(values, dtype=np.int32)
+    order = np.argsort(counts, kind="stable")
+    fig = go.Figure()
+    fig.add_trace(
+        go.Bar(
+            x=counts[order],
+            y=np.asarray(labels)[order],
+            orientation="h",
+            customdata=counts[order] / counts.sum() * 100,
+            texttemplate="%{x} (%{customdata:.2f}%)",
+            textposition="auto",
+            hovertemplate="<b>%{y}</b><br>Betegek száma: %{x}<extra></extra>",
+        ),
+    )
+    fig.update_layout(
+        xaxis_title="Betegek száma",
+        template="plotly_white",
+        height=600,
+        margin={"l": 50, "r": 20, "t": 20, "b": 50},
+        yaxis={"automargin": True},
+    )
+    return fig
+
+
+def display_bno_distribution_chart(stats: dict[str, dict[str, int]], bno_codes: dict[str, str]) -> None:
     """Display the BNO distribution chart for the dashboard.
 
     Args:
-        report_df: The report DataFrame.
+        stats: The precomputed column distributions.
         bno_codes: Dictionary of BNO codes and names.
 
     """
-    bno_distribution = get_distribution(report_df, "Indikáló BNO kód")
+    bno_distribution = stats["Indikáló BNO kód"]
     min_count: int = int(round(sum(bno_distribution.values()) * 0.01, 0))
     filtered_bno_distribution: dict[str, int] = {bno_codes[k]: v for k, v in bno_distribution.items() if v > min_count}
 
     st.subheader("Indikáló BNO kód szerinti eloszlás")
-    fig = go.Figure()
-    fig.add_trace(
-        go.Pie(
-            labels=list[str](filtered_bno_distribution.keys()),
-            values=list[int](filtered_bno_distribution.values()),
-            textinfo="label+percent",
-        ),
+    fig = _distribution_bar_figure(
+        tuple[str, ...](filtered_bno_distribution.keys()),
+        tuple[int, ...](filtered_bno_distribution.values()),
     )
-    fig.update_layout(height=600)
     st.plotly_chart(fig, use_container_width=True)
 
 
-def display_oeno_distribution_chart(report_df: pd.DataFrame, oeno_codes: dict[str, str]) -> None:
+def display_oeno_distribution_chart(stats: dict[str, dict[str, int]], oeno_codes: dict[str, str]) -> None:
     """Display the OENO distribution chart for the dashboard.
 
     Args:
-        report_df: The report DataFrame.
+        stats: The precomputed column distributions.
         oeno_codes: Dictionary of OENO codes and names.
 
     """
-    oeno_distribution = get_distribution(report_df, "Beavatkozás OENO kód")
+    oeno_distribution = stats["Beavatkozás OENO kód"]
     min_count: int = int(round(sum(oeno_distribution.values()) * 0.01, 0))
     filtered_oeno_distribution: dict[str, int] = {}
     for k, v in oeno_distribution.items():
@@ -185,15 +208,10 @@ def display_oeno_distribution_chart(report_df: pd.DataFrame, oeno_codes: dict[st
                 filtered_oeno_distribution[k] = v
 
     st.subheader("Beavatkozás OENO kód szerinti eloszlás")
-    fig = go.Figure()
-    fig.add_trace(
-        go.Pie(
-            labels=list[str](filtered_oeno_distribution.keys()),
-            values=list[int](filtered_oeno_distribution.values()),
-            textinfo="label+percent",
-        ),
+    fig = _distribution_bar_figure(
+        tuple[str, ...](filtered_oeno_distribution.keys()),
+        tuple[int, ...](filtered_oeno_distribution.values()),
     )
-    fig.update_layout(height=600)
     st.plotly_chart(fig, use_container_width=True)
 
 
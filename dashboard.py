@@ -11,7 +11,7 @@ from dash_helpers import (
     display_oeno_distribution_chart,
     display_sidebar,
 )
-from report import get_error_df, get_report, read_bno_codes, read_oeno_codes
+from report import STATS_COLS, get_error_df, get_report, precompute_stats, read_bno_codes, read_oeno_codes
 
 try:
     locale.setlocale(locale.LC_ALL, "hu_HU.UTF-8")
@@ -23,6 +23,7 @@ except locale.Error:
 
 REPORT = get_report()
 ERROR_DF = get_error_df(REPORT)
+STATS = precompute_stats(REPORT[STATS_COLS])
 BNO_CODES = read_bno_codes()
 OENO_CODES = read_oeno_codes()
 PAGE_TITLE = "Dashboard Program"
@@ -35,11 +36,11 @@ st.title(f"{PAGE_ICON} {PAGE_TITLE}")
 st.markdown("---")
 display_metrics(REPORT, ERROR_DF)
 st.markdown("---")
-display_age_distribution_chart(REPORT)
+display_age_distribution_chart(REPORT, STATS)
 st.markdown("---")
-display_bno_distribution_chart(REPORT, BNO_CODES)
+display_bno_distribution_chart(STATS, BNO_CODES)
 st.markdown("---")
-display_oeno_distribution_chart(REPORT, OENO_CODES)
+display_oeno_distribution_chart(STATS, OENO_CODES)
 st.markdown("---")
 st.header("Hibás rekordok")
 st.dataframe(ERROR_DF, use_container_width=True, hide_index=True)
@@ -5,13 +5,19 @@ and for processing the data into a format suitable for the dashboard.
 
 """
 
-import csv
+import json
+import os
 import re
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import streamlit as st
 import xlrd
 
 EF_COLS_TO_KEEP = [
@@ -48,7 +54,55 @@ EF_COLS_TO_KEEP = [
     "Kassza azonosító",
 ]
 
+# Version of the on-disk Parquet cache; bump it whenever the .xls reader code
+# changes, so caches written by the old code are rebuilt.
+EF_CACHE_VERSION = 1
 
+# Code columns that pandas would otherwise infer as numbers in some files,
+# losing their leading zeros and mixing str and float values in one column.
+EF_TEXT_COLS = [
+    "Térítési kategória",
+    "Beutaló szervezeti egység",
+    "Beutalást megalapozó adat",
+    "Eszköz / Eljárás kódja",
+    "Pótkód",
+    "Kiegészítő kód",
+    "Beavatkozás OENO kód",
+    "Indikáló BNO kód",
+    "Számlát kiállító cég",
+    "Számla száma",
+    "Hibaüzenetek",
+]
+
+# Low-cardinality code columns stored as categoricals in the report.
+EF_CATEGORY_COLS = [
+    "Nem",
+    "Térítési kategória",
+    "Fekvő / Járóbeteg",
+    "Indikáló BNO kód",
+    "Beavatkozás OENO kód",
+    "Kassza azonosító",
+    "Állampolgárság",
+]
+
+# Columns whose distributions are shown on the dashboard.
+STATS_COLS = [
+    "Életkor csoport",
+    "Nem",
+    "Indikáló BNO kód",
+    "Beavatkozás OENO kód",
+]
+
+# Integer amount columns downcast to the smallest integer dtype that fits.
+EF_AMOUNT_COLS = [
+    "Jelentett érték",
+    "Elszámolt érték",
+    "Jelentett mennyiség",
+    "Elszámolt mennyiség",
+]
+
+
+@st.cache_resource(show_spinner=False)
 def read_oeno_codes(
     file_path: Path = Path("data/OENO.html"),
 ) -> dict[str, str]:
@@ -72,6 +126,7 @@ def read_oeno_codes(
         return oeno_codes
 
 
+@st.cache_resource(show_spinner=False)
 def read_bno_codes(
     csv_path: Path = Path("data/BNO.csv"),
     code_column_name: str = "KOD10,C,5",
@@ -88,14 +143,60 @@ def read_bno_codes(
         A dictionary containing the BNO codes.
 
     """
-    with csv_path.open("r") as file:
-        reader: csv.DictReader = csv.DictReader(file)
-        return {row[code_column_name].strip(): row[name_column_name].strip().replace("ï", "ő") for row in reader}
+    bno_df: pd.DataFrame = pd.read_csv(
+        csv_path,
+        usecols=[code_column_name, name_column_name],
+        dtype="string",
+        keep_default_na=False,
+        engine="pyarrow",
+    )
+    codes: pd.Series = bno_df[code_column_name].str.strip()
+    names: pd.Series = bno_df[name_column_name].str.strip().str.replace("ï", "ő", regex=False)
+    return dict(zip(codes.tolist(), names.tolist(), strict=True))
+
+
+def get_source_mtimes(data_folder: Path = Path("data/ef")) -> tuple[tuple[str, float], ...]:
+    """Get the modification times of the EF data (.xls files).
+
+    Args:
+        data_folder: The folder containing the EF data (.xls files).
+
+    Returns:
+        A sorted tuple of (file name, modification time) pairs.
+
+    """
+    return tuple(sorted((file.name, file.stat().st_mtime) for file in data_folder.glob("*.xls")))
+
+
+def _read_one_xls(file: Path, *, drop_cols: bool = True) -> pd.DataFrame:
+    """Read a single EF data (.xls) file.
+
+    Runs in a worker process. The unneeded columns are skipped while parsing,
+    so they are neither deserialized nor pickled back to the parent.
+
+    Args:
+        file: The path to the .xls file.
+        drop_cols: Whether to drop the columns that are not needed.
+
+    Returns:
+        A pandas DataFrame containing the data of the file.
+
+    """
+    return pd.read_excel(
+        xlrd.open_workbook(file, ignore_workbook_corruption=True),
+        usecols=EF_COLS_TO_KEEP if drop_cols else None,
+        dtype=dict.fromkeys(EF_TEXT_COLS, str),
+    )
 
 
 def read_ef_data(data_folder: Path = Path("data/ef"), *, drop_cols: bool = True) -> pd.DataFrame:
     """Read EF data (.xls files) from the given data folder.
 
+    The assembled data is written to a Parquet cache in the data folder, next
+    to a manifest of the cache version, the column schema and the source
+    modification times. Later calls read the cache instead of parsing the .xls
+    files, as long as the manifest still matches.
+
     Args:
         data_folder: The folder containing the EF data (.xls files).
         drop_cols: Whether to drop the columns that are not needed.
@@ -104,17 +205,53 @@ def read_ef_data(data_folder: Path = Path("data/ef"), *, drop_cols: bool = True)
         A pandas DataFrame containing the EF data.
 
     """
-    ef_df: pd.DataFrame = pd.concat(
-        [
-            pd.read_excel(xlrd.open_workbook(file, ignore_workbook_corruption=True))
-            for file in data_folder.glob("*.xls")
-        ],
-    )
-    if drop_cols:
-        ef_df = ef_df[EF_COLS_TO_KEEP]
+    cache_path: Path = data_folder / "_cache.parquet"
+    manifest_path: Path = data_folder / "_cache.json"
+    manifest: dict = {
+        "version": EF_CACHE_VERSION,
+        "cols": EF_COLS_TO_KEEP,
+        "text_cols": EF_TEXT_COLS,
+        "drop_cols": drop_cols,
+        "sources": dict(get_source_mtimes(data_folder)),
+    }
+    if cache_path.exists() and manifest_path.exists() and json.loads(manifest_path.read_text()) == manifest:
+        ef_df: pd.DataFrame = pd.read_parquet(cache_path, engine="pyarrow")
+        # pyarrow restores missing strings as None; use NaN like read_excel does.
+        text_cols: pd.Index = ef_df.select_dtypes(include="object").columns
+        ef_df[text_cols] = ef_df[text_cols].fillna(np.nan)
+        return ef_df
+
+    files: list[Path] = sorted(data_folder.glob("*.xls"))
+    frames: list[pd.DataFrame] = []
+    if files:
+        with ProcessPoolExecutor(max_workers=min(len(files), os.cpu_count() or 1)) as executor:
+            frames = list(executor.map(partial(_read_one_xls, drop_cols=drop_cols), files))
+    ef_df = pd.concat(frames, ignore_index=True, copy=False)
+
+    # The cache is best effort: an unwritable folder or a column pyarrow cannot
+    # convert (e.g. mixed str and float values) leaves the data uncached. The
+    # old manifest is removed first so it can never vouch for a partial file.
+    with suppress(OSError, pa.ArrowException):
+        manifest_path.unlink(missing_ok=True)
+        ef_df.to_parquet(cache_path, engine="pyarrow", compression="zstd")
+        manifest_path.write_text(json.dumps(manifest))
     return ef_df
 
 
+def _month_day(dates: np.ndarray | np.datetime64) -> np.ndarray:
+    """Encode the month and day of the given dates as comparable integers.
+
+    Args:
+        dates: Day-precision datetime64 array or scalar.
+
+    Returns:
+        Integers that order the dates by (month, day), ignoring the year.
+
+    """
+    months: np.ndarray = dates.astype("datetime64[M]")
+    return (months.astype(int) % 12) * 32 + (dates - months).astype(int)
+
+
 def add_age_column(
     ef_df: pd.DataFrame,
     dob_column_name: str = "Születési dátum",
@@ -132,7 +269,12 @@ def add_age_column(
 
     """
     ef_df[dob_column_name] = pd.to_datetime(ef_df[dob_column_name])
-    ef_df[age_column_name] = ((datetime.now() - ef_df[dob_column_name]).dt.days / 365.25).astype(int)
+    dob: np.ndarray = ef_df[dob_column_name].to_numpy().astype("datetime64[D]")
+    today: np.datetime64 = np.datetime64(datetime.now().date(), "D")
+    years: np.ndarray = today.astype("datetime64[Y]").astype(int) - dob.astype("datetime64[Y]").astype(int)
+    # Subtract a year where the birthday (month, day) has not passed yet this year.
+    birthday_not_yet: np.ndarray = _month_day(dob) > _month_day(today)
+    ef_df[age_column_name] = (years - birthday_not_yet).astype("int16")
     return ef_df
 
 
@@ -154,22 +296,53 @@ def add_age_bins(
         The pandas DataFrame with the age bins column.
 
     """
-    age_distribution: pd.Series = ef_df[age_column_name].value_counts().sort_index()
-    start_bin: int = (age_distribution.index.min() // bin_size) * bin_size
-    end_bin: int = ((age_distribution.index.max() // bin_size) + 1) * bin_size
-    bins: list[int] = list[int](range(start_bin, end_bin + 1, bin_size))
-
-    ef_df[age_bin_column_name] = pd.cut(
-        ef_df[age_column_name],
-        bins=bins,
-        labels=[f"{b}-{b + bin_size - 1}" for b in bins[:-1]],
-        right=True,
-        include_lowest=True,
+    start_bin: int = (int(ef_df[age_column_name].min()) // bin_size) * bin_size
+    end_bin: int = ((int(ef_df[age_column_name].max()) // bin_size) + 1) * bin_size
+    bins: np.ndarray = np.arange(start_bin, end_bin + 1, bin_size, dtype=np.int32)
+
+    codes: np.ndarray = ((ef_df[age_column_name].to_numpy() - start_bin) // bin_size).astype(np.int16)
+    ef_df[age_bin_column_name] = pd.Categorical.from_codes(
+        codes,
+        categories=[f"{b}-{b + bin_size - 1}" for b in bins[:-1]],
         ordered=True,
     )
     return ef_df
 
 
+def add_period_attrs(ef_df: pd.DataFrame, period_column_name: str = "Időszak") -> pd.DataFrame:
+    """Store the formatted start and end of the reporting period in the DataFrame attrs.
+
+    Args:
+        ef_df: Pandas DataFrame containing the data.
+        period_column_name: The name of the column containing the period (YYYYMM).
+
+    Returns:
+        The pandas DataFrame with the "period_start_fmt" and "period_end_fmt" attrs.
+
+    """
+    ef_df.attrs["period_start_fmt"] = datetime.strptime(str(ef_df[period_column_name].min()), "%Y%m").strftime("%Y. %B")
+    ef_df.attrs["period_end_fmt"] = datetime.strptime(str(ef_df[period_column_name].max()), "%Y%m").strftime("%Y. %B")
+    return ef_df
+
+
+def optimize_dtypes(ef_df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink the memory footprint of the given pandas DataFrame.
+
+    Args:
+        ef_df: Pandas DataFrame containing the data.
+
+    Returns:
+        The pandas DataFrame with categorical code columns and downcast numeric columns.
+
+    """
+    for column_name in EF_CATEGORY_COLS:
+        ef_df[column_name] = ef_df[column_name].astype("category")
+    for column_name in EF_AMOUNT_COLS:
+        ef_df[column_name] = pd.to_numeric(ef_df[column_name], downcast="integer")
+    return ef_df
+
+
+@st.cache_data(show_spinner=False)
 def get_error_df(
     ef_df: pd.DataFrame,
     error_column_name: str = "Elszámolt érték",
@@ -186,7 +359,13 @@ def get_error_df(
         The pandas DataFrame with the error data.
 
     """
-    errors: pd.DataFrame = ef_df[(ef_df[error_column_name] == 0) & (ef_df["Jelentett érték"] != 0)]
+    # Build the mask on the raw numpy buffers and gather by position, skipping
+    # pandas' index alignment of boolean Series.
+    financed: np.ndarray = ef_df[error_column_name].to_numpy()
+    reported: np.ndarray = ef_df["Jelentett érték"].to_numpy()
+    errors: pd.DataFrame = ef_df.take(np.flatnonzero((financed == 0) & (reported != 0)))
+    # Sorting a categorical compares the integer codes instead of the message strings.
+    errors = errors.assign(**{error_message_column_name: errors[error_message_column_name].astype("category")})
     return errors.sort_values(by=error_message_column_name)
 
 
@@ -204,17 +383,77 @@ def get_distribution(
         A dictionary containing the distribution of the given column.
 
     """
+    if isinstance(ef_df[column_name].dtype, pd.CategoricalDtype):
+        return get_category_distribution(ef_df[column_name])
     return ef_df[column_name].value_counts().sort_index().to_dict()
 
 
-def get_report() -> pd.DataFrame:
-    """Get the report data.
+def get_category_distribution(series: pd.Series) -> dict[str, int]:
+    """Get the distribution of the given categorical series by counting its codes.
+
+    Args:
+        series: Pandas Series of category dtype.
+
+    Returns:
+        A dictionary containing the count of each category, in category order.
+
+    """
+    codes: np.ndarray = series.cat.codes.to_numpy()
+    counts: np.ndarray = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+    return dict(zip(series.cat.categories, counts.tolist(), strict=True))
+
+
+@st.cache_data(show_spinner=False)
+def precompute_stats(
+    ef_df: pd.DataFrame,
+    column_names: tuple[str, ...] = tuple(STATS_COLS),
+) -> dict[str, dict[str, int]]:
+    """Get the distributions of the given columns in one go.
+
+    Args:
+        ef_df: Pandas DataFrame containing the data.
+        column_names: The names of the columns to get the distributions of.
+
+    Returns:
+        A dictionary mapping each column name to its distribution.
+
+    """
+    return {column_name: get_distribution(ef_df, column_name) for column_name in column_names}
+
+
+@st.cache_data(show_spinner=False)
+def _build_report(data_folder: Path, source_mtimes: tuple[tuple[str, float], ...]) -> pd.DataFrame:  # noqa: ARG001
+    """Build the report data.
+
+    Cached with st.cache_data, so the report is only rebuilt when the source
+    modification times change.
+
+    Args:
+        data_folder: The folder containing the EF data (.xls files).
+        source_mtimes: The modification times of the .xls files, used as the cache key.
 
     Returns:
         The pandas DataFrame with the report data.
 
     """
-    ef_df: pd.DataFrame = read_ef_data()
+    ef_df: pd.DataFrame = read_ef_data(data_folder)
     ef_df = add_age_column(ef_df)
     ef_df = add_age_bins(ef_df)
-    return deepcopy(ef_df)
+    ef_df = add_period_attrs(ef_df)
+    return optimize_dtypes(ef_df)
+
+
+def get_report(data_folder: Path = Path("data/ef")) -> pd.DataFrame:
+    """Get the report data.
+
+    The report is cached across reruns and only rebuilt when an .xls file in
+    the data folder is added, removed or modified.
+
+    Args:
+        data_folder: The folder containing the EF data (.xls files).
+
+    Returns:
+        The pandas DataFrame with the report data.
+
+    """
+    return _build_report(data_folder, get_source_mtimes(data_folder))